@@ -144,8 +144,11 @@ class GEMSEC(Estimator):
         """
         Updating the embedding weights and cluster centers with gradient descent.
         """
-        random.shuffle(self._walker.walks)
-        for walk in self._walker.walks:
+        nodes = np.asarray(self._walker.nodes)
+        walks = self._walker.walks
+        for index in np.random.permutation(len(walks)):
+            row = walks[index]
+            walk = nodes[row[row >= 0]].tolist()
             for i, source_node in enumerate(walk[:self.walk_length-self.window_size]):
                 for step in range(1, self.window_size+1):
                     target_node = walk[i+step]
@@ -330,8 +333,11 @@ class MultiGEMSEC(Estimator):
         """
         Updating the embedding weights and cluster centers with gradient descent.
         """
-        random.shuffle(self._walker.walks)
-        for walk in self._walker.walks:
+        nodes = np.asarray(self._walker.nodes)
+        walks = self._walker.walks
+        for index in np.random.permutation(len(walks)):
+            row = walks[index]
+            walk = nodes[row[row >= 0]].tolist()
             for i, source_node in enumerate(walk[:self.walk_length-self.window_size]):
                 for step in range(1, self.window_size+1):
                     target_node = walk[i+step]
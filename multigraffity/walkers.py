@@ -1,43 +1,362 @@
+import bisect
+import collections
+import itertools
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
 import numpy as np
 import networkx as nx
+from numba import get_num_threads, njit, prange, set_num_threads
+from numba.np.ufunc import parallel as numba_parallel
 
 
-class BaseWalker:
+_ALIAS_MIN_DEGREE = 32
+_ALIAS_MAX_TRIES = 8
+_SINK_CHUNK_NODES = 1024
+_STITCH_MIN_STEPS = 8
+_STITCH_SPARE_RATE = 0.05
+
+
+def _build_csr(graph):
     """
-    Base class for further Random Walker implementation
+    Flattening the adjacency of a multigraph into CSR arrays, one entry per parallel edge.
+    Arg types:
+        * **graph** *(NetworkX Multigraph)* - The graph to be flattened.
+    Return types:
+        * **nodes** *(list)* - Node labels indexed by dense node id.
+        * **indptr** *(NumPy array)* - Offsets of the neighborhood of every node.
+        * **nbr** *(NumPy array)* - Dense ids of the neighbors.
+        * **w** *(NumPy array)* - Weights of the edges in single precision.
+        * **key** *(NumPy array)* - Dense ids of the edge keys.
+        Node and key ids are int32 unless there are too many of them.
     """
-    def __init__(self, walk_length: int, walk_number: int):
-        self.walk_length = walk_length
-        self.walk_number = walk_number
+    adjacency = list(graph.adjacency())
+    nodes = [node for node, _ in adjacency]
+    node2id = {node: index for index, node in enumerate(nodes)}
+    key2id = {}
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    nbr, w, key = [], [], []
+    for index, (_, neighbors) in enumerate(adjacency):
+        for neigh, edges in neighbors.items():
+            for edge_key, data in edges.items():
+                nbr.append(node2id[neigh])
+                w.append(data['weight'])
+                key.append(key2id.setdefault(edge_key, len(key2id)))
+        indptr[index + 1] = len(nbr)
+    id_dtype = np.int32 if max(len(nodes), len(key2id)) < 2**31 else np.int64
+    nbr = np.array(nbr, dtype=id_dtype)
+    w = np.array(w, dtype=np.float32)
+    key = np.array(key, dtype=id_dtype)
+    return nodes, indptr, nbr, w, key
 
-    def do_walk(self, node):
-        """Method to conduct random walk from provided node. To be overwritten."""
-        pass
 
-    def do_walks(self, graph):
-        """
-        Doing a fixed number of truncated random walk from every node in the graph.
-        Graph type is either NetworkX Graph or NetworkX Multigraph.
-        """
-        self.walks = []
-        self.graph = graph
-        for node in self.graph.nodes():
-            for _ in range(self.walk_number):
-                walk_from_node = self.do_walk(node)
-                self.walks.append(walk_from_node)
+def _build_neighbor_csr(graph, nodes, node2id):
+    """
+    Flattening the neighbors of every node into CSR arrays of dense ids, sorted within
+    every neighborhood so membership can be tested by binary search.
+    Arg types:
+        * **graph** *(NetworkX graph)* - The graph to be flattened.
+        * **nodes** *(list)* - Node labels indexed by dense node id.
+        * **node2id** *(dict)* - Dense id of every node label.
+    Return types:
+        * **indptr** *(NumPy array)* - Offsets of the neighborhood of every node.
+        * **nbr** *(NumPy array)* - Sorted dense ids of the neighbors.
+    """
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    nbr = []
+    for index, node in enumerate(nodes):
+        nbr.extend(sorted(node2id[neigh] for neigh in graph._adj[node]))
+        indptr[index + 1] = len(nbr)
+    nbr = np.array(nbr, dtype=np.int32 if len(nodes) < 2**31 else np.int64)
+    return indptr, nbr
 
 
-class RandomWalker:
+@njit(cache=True)
+def _seed(seed):
+    """Seeding the random generator used inside the compiled kernels."""
+    np.random.seed(seed)
+
+
+@njit(cache=True, boundscheck=False, fastmath=True)
+def _walk_hops(indptr, nbr, w, key, prob, alias, start, walk_length, hop_rate, out):
     """
-    Class to do fast first-order random walks.
+    Doing a single truncated random walk with edge hops over CSR arrays. Steps from
+    high-degree nodes draw an edge from the alias tables of the static weights and keep
+    it with probability proportional to its hop factor, falling back to the cumulative
+    sum after a few rejected draws. The hop factor is computed without branching, on the
+    first step every edge gets the same factor which leaves the distribution unchanged.
+    Arg types:
+        * **indptr**, **nbr**, **w**, **key** *(NumPy arrays)* - CSR arrays of the multigraph.
+        * **prob**, **alias** *(NumPy arrays)* - Alias tables of the edge weights.
+        * **start** *(int)* - Dense id of the source node.
+        * **walk_length** *(int)* - Number of nodes in truncated walk.
+        * **hop_rate** *(float)* - Weight factor of edges with a key different from the previous one.
+        * **out** *(NumPy array)* - Row of the walk matrix the walk is written into.
+    Return types:
+        * **length** *(int)* - Number of nodes written into the row.
+    """
+    out[0] = start
+    current = start
+    prev_key = -1
+    for step in range(1, walk_length):
+        begin, end = indptr[current], indptr[current + 1]
+        if begin == end:
+            return step
+        index = -1
+        if end - begin >= _ALIAS_MIN_DEGREE:
+            bound = max(hop_rate, 1.) if prev_key >= 0 else hop_rate
+            for _ in range(_ALIAS_MAX_TRIES):
+                column = np.random.randint(begin, end)
+                candidate = column if np.random.random() < prob[column] else alias[column]
+                factor = 1. + (hop_rate - 1.) * (key[candidate] != prev_key)
+                if factor == bound or np.random.random() * bound < factor:
+                    index = candidate
+                    break
+        if index < 0:
+            cum = np.empty(end - begin)
+            total = 0.
+            for i in range(begin, end):
+                total += w[i] * (1. + (hop_rate - 1.) * (key[i] != prev_key))
+                cum[i - begin] = total
+            index = begin + min(np.searchsorted(cum, np.random.random() * total, side='right'), end - begin - 1)
+        current = nbr[index]
+        prev_key = key[index]
+        out[step] = current
+    return walk_length
+
+
+@njit(cache=True, boundscheck=False)
+def _walk_biased(indptr, nbr, start, walk_length, p, q, cum, out):
+    """
+    Doing a single truncated second order random walk over sorted CSR arrays. Neighbors
+    shared with the previous node are found by binary search in its neighborhood.
+    Arg types:
+        * **indptr**, **nbr** *(NumPy arrays)* - CSR offsets and sorted neighbor ids of the graph.
+        * **start** *(int)* - Dense id of the source node.
+        * **walk_length** *(int)* - Number of nodes in truncated walk.
+        * **p**, **q** *(float)* - Return and in-out parameters.
+        * **cum** *(NumPy array)* - Buffer of at least the maximal degree for the cumulative weights.
+        * **out** *(NumPy array)* - Row of the walk matrix the walk is written into.
+    Return types:
+        * **length** *(int)* - Number of nodes written into the row.
+    """
+    out[0] = start
+    current = start
+    previous = -1
+    for step in range(1, walk_length):
+        begin, end = indptr[current], indptr[current + 1]
+        if begin == end:
+            return step
+        total = 0.
+        for i in range(begin, end):
+            neighbor = nbr[i]
+            if neighbor == previous:
+                total += 1. / p
+            elif previous >= 0:
+                low, high = indptr[previous], indptr[previous + 1]
+                position = low + np.searchsorted(nbr[low:high], neighbor)
+                total += 1. if position < high and nbr[position] == neighbor else 1. / q
+            else:
+                total += 1. / q
+            cum[i - begin] = total
+        index = min(np.searchsorted(cum[:end - begin], np.random.random() * total, side='right'), end - begin - 1)
+        previous = current
+        current = nbr[begin + index]
+        out[step] = current
+    return walk_length
+
+
+@njit(cache=True)
+def _cumulate_weights(indptr, w):
+    """
+    Computing the cumulative edge weights within the neighborhood of every node.
+    Arg types:
+        * **indptr**, **w** *(NumPy arrays)* - CSR offsets and edge weights of the multigraph.
+    Return types:
+        * **cumw** *(NumPy array)* - Cumulative weights, restarting at every node.
+    """
+    cumw = np.empty(len(w))
+    for node in range(len(indptr) - 1):
+        total = 0.
+        for i in range(indptr[node], indptr[node + 1]):
+            total += w[i]
+            cumw[i] = total
+    return cumw
+
+
+@njit(cache=True)
+def _build_alias_tables(indptr, w):
+    """
+    Building Vose's alias tables for the neighborhoods of high-degree nodes.
+    Arg types:
+        * **indptr**, **w** *(NumPy arrays)* - CSR offsets and edge weights of the multigraph.
+    Return types:
+        * **prob** *(NumPy array)* - Probability of keeping the drawn edge.
+        * **alias** *(NumPy array)* - Edge taken instead when the drawn edge is not kept.
+    """
+    prob = np.ones(len(w))
+    alias = np.arange(len(w))
+    degrees = indptr[1:] - indptr[:-1]
+    max_degree = degrees.max() if len(degrees) > 0 else 0
+    small = np.empty(max_degree, dtype=np.int64)
+    large = np.empty(max_degree, dtype=np.int64)
+    for node in range(len(indptr) - 1):
+        begin, end = indptr[node], indptr[node + 1]
+        if end - begin < _ALIAS_MIN_DEGREE:
+            continue
+        total = 0.
+        for i in range(begin, end):
+            total += w[i]
+        if total <= 0.:
+            continue
+        n_small, n_large = 0, 0
+        for i in range(begin, end):
+            prob[i] = w[i] * (end - begin) / total
+            if prob[i] < 1.:
+                small[n_small] = i
+                n_small += 1
+            else:
+                large[n_large] = i
+                n_large += 1
+        while n_small > 0 and n_large > 0:
+            n_small -= 1
+            n_large -= 1
+            less, more = small[n_small], large[n_large]
+            alias[less] = more
+            prob[more] = prob[more] + prob[less] - 1.
+            if prob[more] < 1.:
+                small[n_small] = more
+                n_small += 1
+            else:
+                large[n_large] = more
+                n_large += 1
+        for i in range(n_small):
+            prob[small[i]] = 1.
+        for i in range(n_large):
+            prob[large[i]] = 1.
+    return prob, alias
+
+
+@njit(cache=True, parallel=True, boundscheck=False)
+def _walks_all(indptr, nbr, cumw, prob, alias, walk_length, walk_number, seed, out):
+    """
+    Doing a fixed number of truncated weighted random walk from every node over CSR arrays,
+    with the source nodes spread over threads. The random generator is seeded with
+    seed + node for every source node, so the walks do not depend on the thread count.
+    Loading it starts the threading layer of Numba, so the workers of do_walks are spawned afterwards.
+    Arg types:
+        * **indptr**, **nbr** *(NumPy arrays)* - CSR offsets and neighbor ids of the multigraph.
+        * **cumw** *(NumPy array)* - Cumulative weights of every neighborhood.
+        * **prob**, **alias** *(NumPy arrays)* - Alias tables of the edge weights.
+        * **walk_length** *(int)* - Number of nodes in truncated walk.
+        * **walk_number** *(int)* - Number of random walks from every node.
+        * **seed** *(int)* - Random seed value.
+        * **out** *(NumPy array)* - Walk matrix filled with -1 the walks are written into.
+    """
+    for source in prange(len(indptr) - 1):
+        node = np.int64(source)
+        np.random.seed(seed + node)
+        for walk in range(walk_number):
+            row = node * walk_number + walk
+            current = node
+            out[row, 0] = current
+            for step in range(1, walk_length):
+                begin, end = indptr[current], indptr[current + 1]
+                if begin == end:
+                    break
+                if end - begin >= _ALIAS_MIN_DEGREE:
+                    column = np.random.randint(begin, end)
+                    index = column if np.random.random() < prob[column] else alias[column]
+                else:
+                    index = begin + np.searchsorted(cumw[begin:end], np.random.random() * cumw[end - 1], side='right')
+                    index = min(index, end - 1)
+                current = nbr[index]
+                out[row, step] = current
+
+
+_WORKER = None
+
+
+def _init_worker(walker_class, state, handles):
+    """
+    Restoring a walker inside a worker process, attaching its arrays from shared memory.
+    Arg types:
+        * **walker_class** *(type)* - Class of the walker.
+        * **state** *(dict)* - Walker attributes besides the shared arrays.
+        * **handles** *(dict)* - Shared memory name, shape and dtype of every shared array.
+    """
+    global _WORKER
+    walker = walker_class.__new__(walker_class)
+    walker.__dict__.update(state)
+    walker._memories = []
+    for name, (memory_name, shape, dtype) in handles.items():
+        memory = shared_memory.SharedMemory(name=memory_name)
+        walker._memories.append(memory)
+        setattr(walker, name, np.ndarray(shape, dtype=dtype, buffer=memory.buf))
+    _WORKER = walker
+
+
+def _run_worker(sources, seed):
+    """
+    Doing the random walks from a chunk of source nodes inside a worker process.
+    Arg types:
+        * **sources** *(list)* - Dense ids of the source nodes.
+        * **seed** *(int)* - Random seed value of the chunk.
+    Return types:
+        * **walks** *(NumPy array)* - The random walks from the chunk.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    _seed(seed)
+    return _WORKER._do_walks_from(sources)
+
+
+class StringWalks:
+    """
+    Re-iterable view of a walk matrix yielding every walk as a list of node label strings,
+    e.g. to feed the walks to Word2Vec without storing them as strings.
     Args:
-        walk_length (int): Number of random walks.
-        walk_number (int): Number of nodes in truncated walk.
+        walks (NumPy array): Walk matrix of dense node ids, padded with -1.
+        nodes (list): Node labels indexed by dense node id.
     """
-    def __init__(self, walk_length: int, walk_number: int):
+    def __init__(self, walks: np.ndarray, nodes: list):
+        self.walks = walks
+        self.labels = [str(node) for node in nodes]
+
+    def __len__(self):
+        return len(self.walks)
+
+    def __iter__(self):
+        for row in self.walks:
+            yield [self.labels[w] for w in row[row >= 0].tolist()]
+
+
+class BaseWalker:
+    """
+    Base class for further Random Walker implementation.
+    The walks are stored as a `(number of nodes * walk_number, walk_length)` int32 matrix
+    of dense node ids, `nodes` maps the ids back to node labels and walks which could not
+    be continued are padded with -1.
+    Walkers listing array attributes in `_shared_arrays` walk on those arrays only,
+    so with several jobs the arrays are placed in shared memory and the graph is not
+    sent to the worker processes.
+    """
+    _shared_arrays = ()
+
+    def __init__(self, walk_length: int, walk_number: int, n_jobs: int=1):
         self.walk_length = walk_length
         self.walk_number = walk_number
+        if n_jobs == 0 or n_jobs < -1:
+            raise ValueError("Number of jobs must be a positive integer or -1.")
+        self.n_jobs = n_jobs
+
+    def _do_walk(self, source, out):
+        """
+        Method to conduct random walk from provided node id into a row of the walk matrix,
+        returning the number of nodes written. To be overwritten.
+        """
+        pass
 
     def do_walk(self, node):
         """
@@ -47,29 +366,138 @@ class RandomWalker:
         Return types:
             * **walk** *(list of strings)* - A single truncated random walk.
         """
-        walk = [node]
-        for _ in range(self.walk_length-1):
-            nebs = [node for node in self.graph.neighbors(walk[-1])]
-            if len(nebs) > 0:
-                walk = walk + random.sample(nebs, 1)
-        walk = [str(w) for w in walk]
+        row = np.empty(self.walk_length, dtype=np.int32)
+        length = self._do_walk(self._node2id[node], row)
+        walk = [str(self.nodes[w]) for w in row[:length]]
         return walk
 
-    def do_walks(self, graph):
+    @property
+    def walks_str(self):
+        """Walks as lists of node label strings, converted lazily while iterating."""
+        return StringWalks(self.walks, self.nodes)
+
+    def _setup(self, graph):
+        """Preparing the walker for the graph. To be extended."""
+        self.graph = graph
+        self.nodes = list(self.graph.nodes())
+        self._node2id = {node: index for index, node in enumerate(self.nodes)}
+
+    def _do_walks_from(self, sources):
+        """
+        Doing a fixed number of truncated random walk from every provided node.
+        Arg types:
+            * **sources** *(list)* - Dense ids of the source nodes.
+        Return types:
+            * **walks** *(NumPy array)* - The random walks, padded with -1.
+        """
+        walks = np.full((len(sources) * self.walk_number, self.walk_length), -1, dtype=np.int32)
+        row = 0
+        for source in sources:
+            for _ in range(self.walk_number):
+                self._do_walk(source, walks[row])
+                row = row + 1
+        return walks
+
+    def _iterate_walks(self, sources, n_jobs, chunk_size):
+        """
+        Doing the random walks chunk by chunk, distributing the chunks over worker
+        processes when there are several jobs. At most two chunks per job are in flight,
+        so with a slow consumer only that many walk blocks wait in memory. Once a parallel
+        kernel has started the threads of Numba in this process, the workers are spawned
+        rather than forked, which needs an `if __name__ == "__main__"` guard in the caller.
+        Arg types:
+            * **sources** *(list)* - Dense ids of the source nodes.
+            * **n_jobs** *(int)* - Number of worker processes.
+            * **chunk_size** *(int)* - Maximal number of source nodes in a chunk.
+        Return types:
+            * **walks** *(generator of NumPy arrays)* - The random walks of every chunk in the order of the source nodes.
+        """
+        if n_jobs <= 1 or len(sources) <= 1:
+            for i in range(0, max(len(sources), 1), chunk_size):
+                yield self._do_walks_from(sources[i:i + chunk_size])
+            return
+        excluded = set(self._shared_arrays) | {"walks"}
+        if self._shared_arrays:
+            excluded.add("graph")
+        state = {name: value for name, value in self.__dict__.items() if name not in excluded}
+        memories, handles = [], {}
+        try:
+            for name in self._shared_arrays:
+                array = getattr(self, name)
+                memory = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+                memories.append(memory)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=memory.buf)[:] = array
+                handles[name] = (memory.name, array.shape, array.dtype.str)
+            chunk_size = min(chunk_size, -(-len(sources) // (4 * n_jobs)))
+            chunks = [sources[i:i + chunk_size] for i in range(0, len(sources), chunk_size)]
+            seeds = np.random.randint(2**31 - 1, size=len(chunks)).tolist()
+            context = get_context("spawn") if getattr(numba_parallel, "_is_initialized", False) else None
+            with ProcessPoolExecutor(n_jobs, mp_context=context, initializer=_init_worker,
+                                     initargs=(type(self), state, handles)) as executor:
+                pending = collections.deque()
+                for chunk, seed in zip(chunks, seeds):
+                    if len(pending) == 2 * n_jobs:
+                        yield pending.popleft().result()
+                    pending.append(executor.submit(_run_worker, chunk, seed))
+                while pending:
+                    yield pending.popleft().result()
+        finally:
+            for memory in memories:
+                memory.close()
+                memory.unlink()
+
+    def do_walks(self, graph, sink=None):
         """
         Doing a fixed number of truncated random walk from every node in the graph.
+        Graph type is either NetworkX Graph or NetworkX Multigraph.
         Arg types:
             * **graph** *(NetworkX graph)* - The graph to run the random walks on.
+            * **sink** *(binary file object, optional)* - When provided, the walks are written to it
+              chunk by chunk as lines of space separated node labels instead of being stored.
         """
-        self.walks = []
-        self.graph = graph
-        for node in self.graph.nodes():
-            for _ in range(self.walk_number):
-                walk_from_node = self.do_walk(node)
-                self.walks.append(walk_from_node)
+        self._setup(graph)
+        sources = list(range(len(self.nodes)))
+        n_jobs = os.cpu_count() if self.n_jobs == -1 else self.n_jobs
+        if sink is None:
+            self.walks = np.concatenate(list(self._iterate_walks(sources, n_jobs, max(len(sources), 1))))
+        else:
+            self.walks = None
+            labels = [str(node).encode() for node in self.nodes]
+            for walks in self._iterate_walks(sources, n_jobs, _SINK_CHUNK_NODES):
+                sink.writelines(b" ".join([labels[w] for w in row if w >= 0]) + b"\n" for row in walks.tolist())
+
+
+class RandomWalker(BaseWalker):
+    """
+    Class to do fast first-order random walks.
+    Args:
+        walk_length (int): Number of random walks.
+        walk_number (int): Number of nodes in truncated walk.
+        n_jobs (int): Number of worker processes, -1 to use all processors. Default is 1.
+    """
+    def __init__(self, walk_length: int, walk_number: int, n_jobs: int=1):
+        super().__init__(walk_length, walk_number, n_jobs)
+
+    def _do_walk(self, source, out):
+        """
+        Doing a single truncated random walk from a source node.
+        Arg types:
+            * **source** *(int)* - Dense id of the source node of the random walk.
+            * **out** *(NumPy array)* - Row of the walk matrix the walk is written into.
+        Return types:
+            * **length** *(int)* - Number of nodes in the walk.
+        """
+        walk = [self.nodes[source]]
+        for _ in range(self.walk_length-1):
+            adj = self.graph._adj[walk[-1]]
+            deg = len(adj)
+            if deg > 0:
+                walk.append(next(itertools.islice(adj, random.randrange(deg), None)))
+        out[:len(walk)] = [self._node2id[w] for w in walk]
+        return len(walk)
 
 
-class BiasedRandomWalker:
+class BiasedRandomWalker(BaseWalker):
     """
     Class to do biased second order random walks.
     Args:
@@ -77,10 +505,12 @@ class BiasedRandomWalker:
         walk_number (int): Number of nodes in truncated walk.
         p (float): Return parameter (1/p transition probability) to move towards from previous node.
         q (float): In-out parameter (1/q transition probability) to move away from previous node.
+        n_jobs (int): Number of worker processes, -1 to use all processors. Default is 1.
     """
-    def __init__(self, walk_length: int, walk_number: int, p: float, q: float):
-        self.walk_length = walk_length
-        self.walk_number = walk_number
+    _shared_arrays = ("_indptr", "_nbr")
+
+    def __init__(self, walk_length: int, walk_number: int, p: float, q: float, n_jobs: int=1):
+        super().__init__(walk_length, walk_number, n_jobs)
         try:
             _ = 1/p
         except ZeroDivisionError:
@@ -92,140 +522,267 @@ class BiasedRandomWalker:
             raise ValueError("The value of q is too small or zero to be used in 1/q.")
         self.q = q
 
-    def do_walk(self, node):
+    def _do_walk(self, source, out):
         """
         Doing a single truncated second order random walk from a source node.
         Arg types:
-            * **node** *(int)* - The source node of the random walk.
+            * **source** *(int)* - Dense id of the source node of the random walk.
+            * **out** *(NumPy array)* - Row of the walk matrix the walk is written into.
         Return types:
-            * **walk** *(list of strings)* - A single truncated random walk.
+            * **length** *(int)* - Number of nodes in the walk.
         """
-        walk = [node]
-        previous_node = None
-        previous_node_neighbors = []
-        for _ in range(self.walk_length-1):
-            current_node = walk[-1]
-            current_node_neighbors = np.array(list(self.graph.neighbors(current_node)))
-            probability = np.array([1/self.q] * len(current_node_neighbors), dtype=float)
-            probability[current_node_neighbors==previous_node] = 1/self.p
-            probability[(np.isin(current_node_neighbors, previous_node_neighbors))] = 1
-            norm_probability = probability/sum(probability)
-            selected = np.random.choice(current_node_neighbors, 1, p=norm_probability)[0]
-            walk.append(selected)
-            previous_node_neighbors = current_node_neighbors
-            previous_node = current_node
-        walk = [str(w) for w in walk]
-        return walk
+        return _walk_biased(self._indptr, self._nbr, source, self.walk_length, float(self.p), float(self.q),
+                            self._cum_buf, out)
 
-    def do_walks(self, graph):
+    def _setup(self, graph):
         """
-        Doing a fixed number of truncated random walk from every node in the graph.
+        Flattening the neighbors of every node into sorted CSR arrays of dense ids, with
+        a cumulative weight buffer reused by every step.
         Arg types:
             * **graph** *(NetworkX graph)* - The graph to run the random walks on.
         """
-        self.walks = []
-        self.graph = graph
-        for node in self.graph.nodes():
-            for _ in range(self.walk_number):
-                walk_from_node = self.do_walk(node)
-                self.walks.append(walk_from_node)
+        super()._setup(graph)
+        self._indptr, self._nbr = _build_neighbor_csr(self.graph, self.nodes, self._node2id)
+        self._cum_buf = np.empty(max(np.diff(self._indptr).max(initial=0), 1), dtype=np.float64)
+        _seed(np.random.randint(2**31 - 1))
 
 
-class MultiRandomWalker:
+class MultiRandomWalker(BaseWalker):
     """
     Class to do fast first-order random walks on Multigraph.
     Args:
         walk_length (int): Number of random walks.
         walk_number (int): Number of nodes in truncated walk.
+        n_jobs (int): Number of worker processes, -1 to use all processors. Default is 1.
     """
-    def __init__(self, walk_length: int, walk_number: int):
-        self.walk_length = walk_length
-        self.walk_number = walk_number
+    _shared_arrays = ("_indptr", "_nbr", "_w", "_key", "_cumw", "_prob", "_alias")
 
-    def do_walk(self, node):
+    def __init__(self, walk_length: int, walk_number: int, n_jobs: int=1):
+        super().__init__(walk_length, walk_number, n_jobs)
+
+    def _do_walk(self, source, out):
         """
         Doing a single truncated random walk from a source node.
         Arg types:
-            * **node** *(int)* - The source node of the random walk.
+            * **source** *(int)* - Dense id of the source node of the random walk.
+            * **out** *(NumPy array)* - Row of the walk matrix the walk is written into.
         Return types:
-            * **walk** *(list of strings)* - A single truncated random walk.
+            * **length** *(int)* - Number of nodes in the walk.
         """
-        walk = [node]
+        walk = [source]
         for _ in range(self.walk_length - 1):
-            unique_neighbors = [node for node in self.graph.neighbors(walk[-1])]
-            neighbors, weights = [], []
-            if len(unique_neighbors) > 0:
-                for neigh in unique_neighbors:
-                    for data in self.graph[walk[-1]][neigh].values():
-                        neighbors.append(neigh)
-                        weights.append(data['weight'])
-                walk = walk + random.choices(neighbors, weights=weights, k=1)
-        walk = [str(w) for w in walk]
-        return walk
+            start, end = self._indptr[walk[-1]], self._indptr[walk[-1] + 1]
+            if start == end:
+                break
+            if end - start >= _ALIAS_MIN_DEGREE:
+                column = random.randrange(start, end)
+                index = column if random.random() < self._prob[column] else self._alias[column]
+            else:
+                index = min(bisect.bisect(self._cumw, random.random() * self._cumw[end - 1], start, end), end - 1)
+            walk.append(self._nbr[index])
+        out[:len(walk)] = walk
+        return len(walk)
+
+    def _draw_edges(self, start, end):
+        """
+        Drawing one weighted edge from every provided neighborhood at once.
+        Arg types:
+            * **start**, **end** *(NumPy arrays)* - CSR bounds of non-empty neighborhoods.
+        Return types:
+            * **index** *(NumPy array)* - Position of the drawn edge in the CSR arrays.
+        """
+        index = np.empty(len(start), dtype=np.int64)
+        hub = end - start >= _ALIAS_MIN_DEGREE
+        if hub.any():
+            begin, degree = start[hub], end[hub] - start[hub]
+            column = begin + np.minimum((np.random.random(len(begin)) * degree).astype(np.int64), degree - 1)
+            keep = np.random.random(len(column)) < self._prob[column]
+            index[hub] = np.where(keep, column, self._alias[column])
+        if not hub.all():
+            low, high = start[~hub], end[~hub]
+            values = np.random.random(len(low)) * self._cumw[high - 1]
+            last = high - 1
+            while (low < high).any():
+                middle = np.minimum((low + high) // 2, last)
+                right = self._cumw[middle] <= values
+                low, high = np.where((low < high) & right, middle + 1, low), np.where((low < high) & ~right, middle, high)
+            index[~hub] = np.minimum(low, last)
+        return index
+
+    def _walk_steps(self, starts, steps):
+        """
+        Doing one truncated random walk of a number of steps from every provided node,
+        advancing all the walks together with one vectorized draw per step.
+        Arg types:
+            * **starts** *(NumPy array)* - Dense ids of the start nodes, one per walk.
+            * **steps** *(int)* - Number of steps of every walk.
+        Return types:
+            * **walks** *(NumPy array)* - The random walks, padded with -1.
+        """
+        current = np.asarray(starts, dtype=np.int64)
+        walks = np.full((len(current), steps + 1), -1, dtype=np.int32)
+        walks[:, 0] = current
+        rows = np.arange(len(current))
+        for step in range(1, steps + 1):
+            start, end = self._indptr[current], self._indptr[current + 1]
+            moving = end > start
+            if not moving.all():
+                rows, current, start, end = rows[moving], current[moving], start[moving], end[moving]
+            if len(rows) == 0:
+                break
+            current = self._nbr[self._draw_edges(start, end)]
+            walks[rows, step] = current
+        return walks
+
+    def _do_walks_from(self, sources):
+        """
+        Doing a fixed number of truncated random walk from every provided node.
+        Arg types:
+            * **sources** *(list)* - Dense ids of the source nodes.
+        Return types:
+            * **walks** *(NumPy array)* - The random walks, padded with -1.
+        """
+        starts = np.repeat(np.asarray(sources, dtype=np.int64), self.walk_number)
+        return self._walk_steps(starts, self.walk_length - 1)
 
-    def do_walks(self, graph):
+    def _setup(self, graph):
         """
-        Doing a fixed number of truncated random walk from every node in the multigraph.
+        Flattening the multigraph into CSR arrays with cumulative weights of every neighborhood
+        and alias tables of high-degree nodes.
         Arg types:
             * **graph** *(NetworkX Multigraph)* - The graph to run the random walks on.
         """
-        self.walks = []
         self.graph = graph
-        for node in self.graph.nodes():
-            for _ in range(self.walk_number):
-                walk_from_node = self.do_walk(node)
-                self.walks.append(walk_from_node)
+        self.nodes, self._indptr, self._nbr, self._w, self._key = _build_csr(self.graph)
+        self._node2id = {node: index for index, node in enumerate(self.nodes)}
+        self._cumw = _cumulate_weights(self._indptr, self._w)
+        self._prob, self._alias = _build_alias_tables(self._indptr, self._w)
+
+    def do_walks_numba(self, graph, parallel: bool=True):
+        """
+        Doing a fixed number of truncated random walk from every node in the multigraph in a
+        compiled kernel, the walks do not depend on whether they run in parallel.
+        Arg types:
+            * **graph** *(NetworkX Multigraph)* - The graph to run the random walks on.
+            * **parallel** *(bool)* - Spreading the source nodes over threads. Default is True.
+        """
+        self._setup(graph)
+        self.walks = np.full((len(self.nodes) * self.walk_number, self.walk_length), -1, dtype=np.int32)
+        seed = np.random.randint(2**31 - 1)
+        threads = get_num_threads()
+        if not parallel:
+            set_num_threads(1)
+        try:
+            _walks_all(self._indptr, self._nbr, self._cumw, self._prob, self._alias,
+                       self.walk_length, self.walk_number, seed, self.walks)
+        finally:
+            set_num_threads(threads)
+
+    def _draw_spare_starts(self, count):
+        """
+        Drawing start nodes of spare walks in proportion to the weighted degrees, which is
+        where walks end up on an undirected multigraph.
+        Arg types:
+            * **count** *(float)* - Expected number of spare walks.
+        Return types:
+            * **starts** *(NumPy array)* - Dense ids of the start nodes, in ascending order.
+        """
+        if len(self._cumw) == 0:
+            return np.empty(0, dtype=np.int32)
+        strength = np.where(self._indptr[1:] > self._indptr[:-1], self._cumw[self._indptr[1:] - 1], 0.)
+        expected = count * strength / strength.sum()
+        counts = np.floor(expected).astype(np.int64) + (np.random.random(len(expected)) < expected % 1)
+        return np.repeat(np.arange(len(expected), dtype=np.int32), counts)
+
+    def _stitch_walks(self, starts, steps):
+        """
+        Doing one truncated random walk of a number of steps from every provided node by
+        stitching walks of half the steps, which are done recursively for the start nodes
+        together with a spare pool. Every walk from a start node is continued by a spare
+        walk from its end node, and every spare walk continues at most one walk, so the
+        stitched walks are independent random walks. Ends without an unused spare walk are
+        continued by stitching again with a fresh spare pool, and the shortest walks are
+        done step by step.
+        Arg types:
+            * **starts** *(NumPy array)* - Dense ids of the start nodes, one per walk.
+            * **steps** *(int)* - Number of steps of every walk.
+        Return types:
+            * **walks** *(NumPy array)* - The random walks, padded with -1.
+        """
+        if steps <= _STITCH_MIN_STEPS or len(starts) == 0:
+            return self._walk_steps(starts, steps)
+        front_steps = (steps + 1) // 2
+        spares = self._draw_spare_starts(len(starts) * (1 + _STITCH_SPARE_RATE))
+        pool = self._stitch_walks(np.concatenate((starts, spares)), front_steps)
+        walks = np.full((len(starts), steps + 1), -1, dtype=np.int32)
+        walks[:, :front_steps + 1] = pool[:len(starts)]
+        backs = pool[len(starts):, 1:steps - front_steps + 1]
+        ends = walks[:, front_steps]
+        moving = np.flatnonzero(ends >= 0)
+        moving = moving[np.argsort(ends[moving], kind='stable')]
+        needed = ends[moving]
+        rank = np.arange(len(needed)) - np.searchsorted(needed, needed, side='left')
+        first = np.searchsorted(spares, needed, side='left')
+        matched = rank < np.searchsorted(spares, needed, side='right') - first
+        walks[moving[matched], front_steps + 1:] = backs[first[matched] + rank[matched]]
+        missing = moving[~matched]
+        walks[missing, front_steps:] = self._stitch_walks(ends[missing], steps - front_steps)
+        return walks
+
+    def do_walks_doubling(self, graph):
+        """
+        Doing a fixed number of truncated random walk from every node in the multigraph by
+        stitching walks of halving length. The walks are independent and follow the same
+        distribution as those of `do_walks`, but this is slower than `do_walks` for normal
+        walk lengths. Spare walks drawn by weighted degree never cover every end node, and
+        the ends left over are stitched again, so the vectorized step rounds still add up to
+        about the walk length, about a third more steps are drawn, and the peak memory is
+        six to seven times the walk matrix against about twice for `do_walks`.
+        Arg types:
+            * **graph** *(NetworkX Multigraph)* - The graph to run the random walks on.
+        """
+        self._setup(graph)
+        starts = np.repeat(np.arange(len(self.nodes), dtype=np.int32), self.walk_number)
+        self.walks = self._stitch_walks(starts, self.walk_length - 1)
 
 
-class MultiRandomWalkerWithHops:
+class MultiRandomWalkerWithHops(BaseWalker):
     """
     Class to do second-order random walks on Multigraph with edge hops
     Args:
         walk_length (int): Number of random walks.
         walk_number (int): Number of nodes in truncated walk.
         hop_rate (float): Hop rate - responds to frequency of link type change while walking.
+        n_jobs (int): Number of worker processes, -1 to use all processors. Default is 1.
     """
-    def __init__(self, walk_length: int, walk_number: int, hop_rate: float):
-        self.walk_length = walk_length
-        self.walk_number = walk_number
+    _shared_arrays = ("_indptr", "_nbr", "_w", "_key", "_prob", "_alias")
+
+    def __init__(self, walk_length: int, walk_number: int, hop_rate: float, n_jobs: int=1):
+        super().__init__(walk_length, walk_number, n_jobs)
         if hop_rate <= 0:
             raise ValueError("Hop rate must be a float number greater than zero.")
         self.hop_rate = hop_rate
 
-    def do_walk(self, node):
+    def _do_walk(self, source, out):
         """
         Doing a single truncated random walk from a source node.
         Arg types:
-            * **node** *(int)* - The source node of the random walk.
+            * **source** *(int)* - Dense id of the source node of the random walk.
+            * **out** *(NumPy array)* - Row of the walk matrix the walk is written into.
         Return types:
-            * **walk** *(list of strings)* - A single truncated random walk.
+            * **length** *(int)* - Number of nodes in the walk.
         """
-        walk = [node]
-        prev_key = None
-        for _ in range(self.walk_length - 1):
-            unique_neighbors = [node for node in self.graph.neighbors(walk[-1])]
-            neighbors, weights = [], []
-            if len(unique_neighbors) > 0:
-                for neigh in unique_neighbors:
-                    for key, data in self.graph[walk[-1]][neigh].items():
-                        factor = self.hop_rate if (prev_key is not None and prev_key != key) else 1.
-                        neighbors.append((neigh, key))
-                        weights.append(data['weight'] * factor)
-                node, key = random.choices(neighbors, weights=weights, k=1)[0]
-                walk = walk + [node]
-                prev_key = key
-        walk = [str(w) for w in walk]
-        return walk
+        return _walk_hops(self._indptr, self._nbr, self._w, self._key, self._prob, self._alias,
+                          source, self.walk_length, float(self.hop_rate), out)
 
-    def do_walks(self, graph):
+    def _setup(self, graph):
         """
-        Doing a fixed number of truncated random walk from every node in the multigraph.
+        Flattening the multigraph into CSR arrays with alias tables of high-degree nodes.
         Arg types:
             * **graph** *(NetworkX Multigraph)* - The graph to run the random walks on.
         """
-        self.walks = []
         self.graph = graph
-        for node in self.graph.nodes():
-            for _ in range(self.walk_number):
-                walk_from_node = self.do_walk(node)
-                self.walks.append(walk_from_node)
\ No newline at end of file
+        self.nodes, self._indptr, self._nbr, self._w, self._key = _build_csr(self.graph)
+        self._node2id = {node: index for index, node in enumerate(self.nodes)}
+        self._prob, self._alias = _build_alias_tables(self._indptr, self._w)
+        _seed(np.random.randint(2**31 - 1))